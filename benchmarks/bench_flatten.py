@@ -0,0 +1,68 @@
+import argparse
+import contextlib
+import io
+import time
+
+import pandas as pd
+
+from db_models import flatten_tweets
+from generate_mock_tweets import generate_all_tweets
+
+
+# The previous per-field Series.apply flattener, kept here as the baseline
+def flatten_with_apply(df):
+    flattened_df = pd.DataFrame()
+    flattened_df['id'] = df['id']
+    flattened_df['text'] = df['text']
+    flattened_df['created_at'] = pd.to_datetime(df['created_at'])
+    flattened_df['company'] = df['company']
+    flattened_df['sentiment_score'] = df['sentiment'].apply(lambda x: x['score'])
+    flattened_df['sentiment_label'] = df['sentiment'].apply(lambda x: x['label'])
+    flattened_df['sentiment_confidence'] = df['sentiment'].apply(lambda x: x.get('confidence'))
+    flattened_df['user_username'] = df['user'].apply(lambda x: x['username'])
+    flattened_df['user_name'] = df['user'].apply(lambda x: x['name'])
+    flattened_df['user_profile_image_url'] = df['user'].apply(lambda x: x['profile_image_url'])
+    flattened_df['user_followers_count'] = df['user'].apply(lambda x: x['followers_count'])
+    flattened_df['retweet_count'] = df['metrics'].apply(lambda x: x['retweet_count'])
+    flattened_df['reply_count'] = df['metrics'].apply(lambda x: x['reply_count'])
+    flattened_df['like_count'] = df['metrics'].apply(lambda x: x['like_count'])
+    flattened_df['quote_count'] = df['metrics'].apply(lambda x: x['quote_count'])
+
+    def extract_hashtags(row):
+        if 'entities' in row and isinstance(row['entities'], dict) and 'hashtags' in row['entities']:
+            hashtags = row['entities']['hashtags']
+            if hashtags and len(hashtags) > 0:
+                return ' '.join([f"#{tag}" for tag in hashtags])
+        return ""
+
+    flattened_df['hashtags'] = df.apply(extract_hashtags, axis=1)
+    return flattened_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark for flattening nested tweet records")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Approximate number of tweets (default: 1M)")
+    parser.add_argument('--skip-baseline', action='store_true', help="Only time flatten_tweets")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = generate_all_tweets(num_tweets_per_company=args.rows // 3, engine='numpy', seed=42)
+    print(f"Flattening {len(df):,} tweets")
+
+    start = time.perf_counter()
+    flattened = flatten_tweets(df)
+    columnar_seconds = time.perf_counter() - start
+    print(f"flatten_tweets:     {columnar_seconds:8.2f}s  {len(df) / columnar_seconds:>12,.0f} rows/sec")
+
+    if not args.skip_baseline:
+        start = time.perf_counter()
+        baseline = flatten_with_apply(df)
+        baseline_seconds = time.perf_counter() - start
+        print(f"Series.apply:       {baseline_seconds:8.2f}s  {len(df) / baseline_seconds:>12,.0f} rows/sec")
+        print(f"speedup:            {baseline_seconds / columnar_seconds:8.1f}x")
+        pd.testing.assert_frame_equal(baseline, flattened, check_dtype=False)
+        print("outputs match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import contextlib
+import io
+import time
+
+import pandas as pd
+
+from generate_mock_tweets import generate_all_tweets
+
+
+# Run one generation and return (seconds, DataFrame), hiding the per-company progress output
+def time_generation(num_tweets_per_company, engine, workers=1):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        df = generate_all_tweets(num_tweets_per_company=num_tweets_per_company, engine=engine, seed=42,
+                                 workers=workers)
+        elapsed = time.perf_counter() - start
+    return elapsed, df
+
+
+# Summarize the distributions both engines are expected to share
+def summarize(df):
+    sentiment = pd.DataFrame(df['sentiment'].tolist())
+    metrics = pd.DataFrame(df['metrics'].tolist())
+    users = pd.DataFrame(df['user'].tolist())
+    return {
+        'positive_share': round(float((sentiment['label'] == 'positive').mean()), 3),
+        'mean_score': round(float(sentiment['score'].mean()), 3),
+        'mean_confidence': round(float(sentiment['confidence'].mean()), 3),
+        'hashtag_share': round(float((df['hashtags'] != '').mean()), 3),
+        'mean_likes': round(float(metrics['like_count'].mean()), 1),
+        'mean_retweets': round(float(metrics['retweet_count'].mean()), 1),
+        'mean_followers': round(float(users['followers_count'].mean()), 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the per-row and vectorized tweet generators")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000],
+                        help="Tweets per company to generate for each run")
+    parser.add_argument('--skip-python-above', type=int, default=50000,
+                        help="Skip the per-row engine for sizes above this (it is slow)")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Also time the numpy engine on this many worker processes")
+    args = parser.parse_args()
+
+    print(f"{'per company':>12} {'engine':>8} {'seconds':>10} {'rows/sec':>12} {'speedup':>8}")
+    for size in args.sizes:
+        numpy_seconds, numpy_df = time_generation(size, 'numpy')
+        rows = len(numpy_df)
+
+        python_seconds = None
+        python_df = None
+        if size <= args.skip_python_above:
+            python_seconds, python_df = time_generation(size, 'python')
+            print(f"{size:>12} {'python':>8} {python_seconds:>10.3f} {rows / python_seconds:>12,.0f} {'':>8}")
+
+        speedup = f"{python_seconds / numpy_seconds:.1f}x" if python_seconds else ''
+        print(f"{size:>12} {'numpy':>8} {numpy_seconds:>10.3f} {rows / numpy_seconds:>12,.0f} {speedup:>8}")
+
+        if args.workers > 1:
+            parallel_seconds, _ = time_generation(size, 'numpy', workers=args.workers)
+            label = f"numpy x{args.workers}"
+            speedup = f"{numpy_seconds / parallel_seconds:.1f}x"
+            print(f"{size:>12} {label:>8} {parallel_seconds:>10.3f} {rows / parallel_seconds:>12,.0f} {speedup:>8}")
+
+        if python_df is not None:
+            print(f"{'':>12} python: {summarize(python_df)}")
+        print(f"{'':>12} numpy:  {summarize(numpy_df)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from db_models import _batch_loader, create_tables, dispose_engines, flatten_tweets, get_engine, get_storage_mode
+from generate_mock_tweets import generate_all_tweets
+from process_tweets_for_frontend import AGGREGATION_MODES, process_tweets_for_frontend
+
+# Layout version of the results file
+RESULTS_VERSION = 1
+
+# Scale presets: (tweets, companies)
+SCALE_PRESETS = {
+    '10k': (10_000, 3),
+    '100k': (100_000, 10),
+    '1m': (1_000_000, 50),
+    '10m': (10_000_000, 500),
+}
+
+# Stages compared against the baseline fail when their throughput drops or their peak RSS
+# grows by more than these fractions
+DEFAULT_THRESHOLD = 0.15
+DEFAULT_MEMORY_THRESHOLD = 0.25
+
+
+# Resident set size of this process in bytes, or None where /proc is not available
+def current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Highest RSS of this process while the block runs, sampled by a background thread. Without
+# /proc it falls back to the lifetime peak reported by getrusage.
+class PeakRSS:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def sample(self):
+        while True:
+            rss = current_rss()
+            if rss is None:
+                return
+            self.peak = max(self.peak, rss)
+            if self.stopped.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        rss = current_rss()
+        if rss is None:
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS
+            scale = 1 if sys.platform == 'darwin' else 1024
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        else:
+            self.peak = max(self.peak, rss)
+
+
+# Run stage() repeat times (calling reset() before each run after the first) and keep the
+# fastest run; returns the stage's result and its timing, throughput and peak RSS
+def run_stage(stage, rows, repeat=1, reset=None):
+    best_seconds = None
+    peak_rss = 0
+    for run in range(repeat):
+        if run > 0 and reset is not None:
+            reset()
+        with PeakRSS() as memory, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = stage()
+            seconds = time.perf_counter() - start
+        best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+        peak_rss = max(peak_rss, memory.peak)
+
+    if callable(rows):
+        rows = rows(result)
+    return result, {
+        'seconds': round(best_seconds, 4),
+        'rows': rows,
+        'rows_per_sec': round(rows / best_seconds, 1) if best_seconds > 0 else None,
+        'peak_rss_bytes': peak_rss
+    }
+
+
+# Spread the tweets evenly at random over num_companies companies, keeping the generator's
+# three companies when that is all that is asked for
+def assign_companies(flattened_df, num_companies, seed):
+    if num_companies == flattened_df['company'].nunique():
+        return flattened_df
+    names = np.array([f"Company {i:03d}" for i in range(num_companies)], dtype=object)
+    flattened_df['company'] = names[np.random.default_rng(seed).integers(0, num_companies, len(flattened_df))]
+    return flattened_df
+
+
+# URL of the same database with the scratch schema first on the search path, so the loaders
+# and reports create and read their tables there
+def scratch_url(db_url, schema):
+    return make_url(db_url).update_query_dict({'options': f'-csearch_path={schema}'}).render_as_string(
+        hide_password=False
+    )
+
+
+def run_pipeline(db_url, tweets, companies, schema, aggregations, days=30, batch_size=10000, seed=42, repeat=1,
+                 workers=1):
+    """
+    Run generate -> flatten -> load -> process once at the given scale and time each stage.
+
+    The tweets are generated with the numpy engine from a fixed seed, flattened, spread over
+    the requested number of companies and loaded with COPY into the tweets table of a scratch
+    schema, which is created for the run and dropped afterwards. The report is then built
+    from that table once per aggregation mode.
+
+    Args:
+        db_url: URL of the PostgreSQL database to benchmark against
+        tweets: Approximate number of tweets (rounded down to a multiple of three companies)
+        companies: Number of companies the tweets are spread over
+        schema: Scratch schema name
+        aggregations: Aggregation modes of process_tweets_for_frontend to time
+        days: Days of history generated and reported on
+        batch_size: Rows per load batch
+        seed: Random seed of the generator and of the company assignment
+        repeat: Runs per stage; the fastest is kept
+        workers: Processes generating the tweets
+
+    Returns:
+        Dict with the run's parameters and environment, and per-stage seconds, rows, rows/sec
+        and peak RSS
+    """
+    with get_engine(db_url).begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+        server_version = conn.execute(text("SHOW server_version")).scalar()
+
+    bench_url = scratch_url(db_url, schema)
+    database_url = os.environ.get('DATABASE_URL')
+    os.environ['DATABASE_URL'] = bench_url
+    stages = {}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_tables()
+        engine = get_engine(bench_url)
+
+        df, stages['generate'] = run_stage(
+            lambda: generate_all_tweets(num_tweets_per_company=tweets // 3, days=days, engine='numpy', seed=seed,
+                                        workers=workers),
+            len, repeat
+        )
+        flattened_df, stages['flatten'] = run_stage(lambda: flatten_tweets(df), len(df), repeat)
+        del df
+        flattened_df = assign_companies(flattened_df, companies, seed)
+
+        def load():
+            with _batch_loader(engine, 'copy') as load_batch:
+                for i in range(0, len(flattened_df), batch_size):
+                    load_batch(flattened_df.iloc[i:i+batch_size])
+
+        def truncate():
+            tables = 'tweets_normalized' if get_storage_mode() == 'normalized' else 'tweets'
+            with engine.begin() as conn:
+                conn.execute(text(f"TRUNCATE {tables}, company_daily_sentiment"))
+
+        _, stages['load'] = run_stage(load, len(flattened_df), repeat, reset=truncate)
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text("VACUUM ANALYZE"))
+
+        for aggregation in aggregations:
+            _, stages[f'process[{aggregation}]'] = run_stage(
+                lambda: process_tweets_for_frontend(db_url=bench_url, days=days, aggregation=aggregation,
+                                                    output_file=None),
+                len(flattened_df), repeat
+            )
+    finally:
+        if database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = database_url
+        dispose_engines()
+        with get_engine(db_url).begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+
+    return {
+        'version': RESULTS_VERSION,
+        'tweets': len(flattened_df),
+        'companies': companies,
+        'days': days,
+        'batch_size': batch_size,
+        'seed': seed,
+        'repeat': repeat,
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'postgres': server_version,
+        'stages': stages
+    }
+
+
+# Regressions of results against a baseline results file, one message per stage and metric
+# that got worse by more than its threshold; stages missing from either side, and metrics
+# without a measurement (e.g. no throughput for a stage that took no measurable time) on
+# either side, are skipped
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD, memory_threshold=DEFAULT_MEMORY_THRESHOLD):
+    if (results['tweets'], results['companies']) != (baseline['tweets'], baseline['companies']):
+        raise ValueError(f"Baseline is for {baseline['tweets']} tweets and {baseline['companies']} companies, "
+                         f"not {results['tweets']} and {results['companies']}")
+
+    regressions = []
+    for stage, stats in results['stages'].items():
+        base = baseline['stages'].get(stage)
+        if base is None:
+            continue
+        throughput, base_throughput = stats['rows_per_sec'], base['rows_per_sec']
+        if throughput and base_throughput and throughput < base_throughput * (1 - threshold):
+            regressions.append(f"{stage}: {throughput:,.0f} rows/sec, "
+                               f"{1 - throughput / base_throughput:.0%} below the baseline's "
+                               f"{base_throughput:,.0f}")
+        peak, base_peak = stats['peak_rss_bytes'], base['peak_rss_bytes']
+        if peak and base_peak and peak > base_peak * (1 + memory_threshold):
+            regressions.append(f"{stage}: peak RSS {peak / 2**20:,.0f} MiB, "
+                               f"{peak / base_peak - 1:.0%} above the baseline's "
+                               f"{base_peak / 2**20:,.0f} MiB")
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print(f"{'stage':>16} {'rows':>11} {'seconds':>9} {'rows/sec':>12} {'peak RSS':>10} {'vs baseline':>12}")
+    for stage, stats in results['stages'].items():
+        throughput = 'n/a' if not stats['rows_per_sec'] else f"{stats['rows_per_sec']:,.0f}"
+        change = ''
+        base = (baseline or {}).get('stages', {}).get(stage)
+        if base is not None:
+            change = 'n/a'
+            if stats['rows_per_sec'] and base['rows_per_sec']:
+                change = f"{stats['rows_per_sec'] / base['rows_per_sec'] - 1:+.1%}"
+        print(f"{stage:>16} {stats['rows']:>11,} {stats['seconds']:>8.2f}s {throughput:>12} "
+              f"{stats['peak_rss_bytes'] / 2**20:>7,.0f}MiB {change:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time generate -> flatten -> load -> process on a local PostgreSQL")
+    parser.add_argument('--preset', choices=SCALE_PRESETS, default='100k',
+                        help="Scale preset: " + ', '.join(f"{name} = {tweets:,} tweets / {companies} companies"
+                                                          for name, (tweets, companies) in SCALE_PRESETS.items()))
+    parser.add_argument('--tweets', type=int, help="Override the preset's number of tweets")
+    parser.add_argument('--companies', type=int, help="Override the preset's number of companies")
+    parser.add_argument('--aggregation', nargs='+', choices=AGGREGATION_MODES, default=['stream', 'sql'],
+                        help="Report aggregation modes to time (default: stream sql)")
+    parser.add_argument('--days', type=int, default=30, help="Days of tweets generated and reported (default: 30)")
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per stage; the fastest is kept (default: 1)")
+    parser.add_argument('--workers', type=int, default=1, help="Generator processes (default: 1)")
+    parser.add_argument('--schema', default='pipeline_bench',
+                        help="Scratch schema the benchmark creates and drops (default: pipeline_bench)")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', help="Results file of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Fail when a stage's rows/sec drops by more than this fraction (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--memory-threshold', type=float, default=DEFAULT_MEMORY_THRESHOLD,
+                        help="Fail when a stage's peak RSS grows by more than this fraction "
+                             f"(default: {DEFAULT_MEMORY_THRESHOLD})")
+    args = parser.parse_args()
+
+    db_url = os.environ.get('DATABASE_URL')
+    if not db_url:
+        raise ValueError("DATABASE_URL environment variable is not set")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    tweets, companies = SCALE_PRESETS[args.preset]
+    tweets = args.tweets or tweets
+    companies = args.companies or companies
+    print(f"Running the pipeline on {tweets:,} tweets over {companies} companies in scratch schema '{args.schema}'")
+    results = run_pipeline(db_url, tweets, companies, args.schema, args.aggregation, days=args.days,
+                           batch_size=args.batch_size, seed=args.seed, repeat=args.repeat, workers=args.workers)
+    results['preset'] = args.preset if (args.tweets, args.companies) == (None, None) else None
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if baseline is not None:
+        regressions = compare_results(results, baseline, args.threshold, args.memory_threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from db_models import flatten_tweets
+from generate_mock_tweets import generate_all_tweets
+from process_tweets_for_frontend import aggregate_tweets_frame
+
+
+# The previous per-company loop (a filtered copy per company, then per-label copies), kept here
+# as the baseline; returns the same per-company numbers as aggregate_tweets_frame
+def aggregate_per_company(df, top_k=5):
+    results = {}
+    for company in df['company'].unique():
+        company_df = df[df['company'] == company].copy()
+        positive_df = company_df[company_df['sentiment_label'] == 'positive']
+        negative_df = company_df[company_df['sentiment_label'] == 'negative']
+
+        company_df['week_start'] = company_df['created_at'].dt.to_period('W-MON').dt.start_time
+        weekly_sentiment = company_df.groupby('week_start').agg(
+            average_score=('sentiment_score', 'mean'),
+            tweet_count=('id', 'count')
+        ).reset_index()
+
+        top_positive = positive_df.sort_values(
+            by=['sentiment_score', 'engagement_score'], ascending=[False, False]
+        ).head(top_k)
+        top_negative = negative_df.sort_values(
+            by=['sentiment_score', 'engagement_score'], ascending=[True, False]
+        ).head(top_k)
+
+        results[company] = (len(company_df), len(positive_df), len(negative_df), weekly_sentiment,
+                            list(top_positive['id']), list(top_negative['id']))
+    return results
+
+
+# Build a report frame (as read from the database, newest first) spread over num_companies
+def build_frame(rows, num_companies, seed=42):
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = flatten_tweets(generate_all_tweets(num_tweets_per_company=rows // 3, engine='numpy', seed=seed))
+    df['created_at'] = pd.to_datetime(df['created_at'])
+    df['engagement_score'] = (df['retweet_count'] * 2 + df['like_count'] +
+                              df['reply_count'] * 1.5 + df['quote_count'] * 1.5)
+    rng = np.random.default_rng(seed)
+    df['company'] = np.array([f"Company {i:03d}" for i in range(num_companies)], dtype=object)[
+        rng.integers(0, num_companies, len(df))
+    ]
+    return df.sort_values('created_at', ascending=False, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pandas report aggregation as the number of companies grows")
+    parser.add_argument('--rows', type=int, default=300_000, help="Approximate number of tweets (default: 300k)")
+    parser.add_argument('--companies', type=int, nargs='+', default=[3, 10, 50, 100, 500])
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--skip-baseline', action='store_true', help="Only time the grouped aggregation")
+    args = parser.parse_args()
+
+    print(f"{'companies':>10} {'grouped':>10} {'per-company':>12} {'speedup':>8}")
+    for num_companies in args.companies:
+        df = build_frame(args.rows, num_companies)
+
+        start = time.perf_counter()
+        summary_df, weekly_df, top_df = aggregate_tweets_frame(df, args.top_k)
+        grouped_seconds = time.perf_counter() - start
+
+        if args.skip_baseline:
+            print(f"{num_companies:>10} {grouped_seconds:>9.2f}s")
+            continue
+
+        start = time.perf_counter()
+        baseline = aggregate_per_company(df, args.top_k)
+        baseline_seconds = time.perf_counter() - start
+        print(f"{num_companies:>10} {grouped_seconds:>9.2f}s {baseline_seconds:>11.2f}s "
+              f"{baseline_seconds / grouped_seconds:>7.1f}x")
+
+        # Both engines must agree on every company
+        weekly_groups = dict(tuple(weekly_df.groupby('company', sort=False)))
+        for company, (total, positive, negative, weekly, top_positive, top_negative) in baseline.items():
+            summary = summary_df.loc[company]
+            assert (summary['total_tweets'], summary['positive_count'], summary['negative_count']) == (total, positive, negative)
+            assert list(weekly_groups[company]['tweet_count']) == list(weekly['tweet_count'])
+            company_top = top_df[top_df['company'] == company]
+            assert list(company_top.loc[company_top['sentiment_label'] == 'positive', 'id']) == top_positive
+            assert list(company_top.loc[company_top['sentiment_label'] == 'negative', 'id']) == top_negative
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import contextlib
+import io
+import os
+import time
+
+from sqlalchemy import create_engine, text
+
+from db_models import Base, UPSERT_METHODS, _batch_loader, _upsert_partitioned, flatten_tweets
+from generate_mock_tweets import generate_all_tweets
+
+
+# Load every row of a flattened frame with one method and return rows/sec
+def time_load(engine, flattened_df, method, batch_size):
+    start = time.perf_counter()
+    with _batch_loader(engine, method) as load_batch:
+        for i in range(0, len(flattened_df), batch_size):
+            load_batch(flattened_df.iloc[i:i+batch_size])
+    return len(flattened_df) / (time.perf_counter() - start)
+
+
+# Load every row with parallel partitioned workers and return rows/sec
+def time_parallel_load(engine, flattened_df, method, batch_size, workers):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        _upsert_partitioned(engine, flattened_df, workers, batch_size, method)
+    return len(flattened_df) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare COPY and to_sql upsert throughput on a local PostgreSQL")
+    parser.add_argument('--tweets-per-company', type=int, default=20000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--methods', nargs='+', default=list(UPSERT_METHODS), choices=UPSERT_METHODS)
+    parser.add_argument('--workers', type=int, nargs='*', default=[],
+                        help="Also time parallel partitioned loads with these worker counts")
+    parser.add_argument('--schema', default='tweets_bench',
+                        help="Scratch schema the benchmark creates and drops (default: tweets_bench)")
+    args = parser.parse_args()
+
+    db_url = os.environ.get('DATABASE_URL')
+    if not db_url:
+        raise ValueError("DATABASE_URL environment variable is not set")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = generate_all_tweets(num_tweets_per_company=args.tweets_per_company, engine='numpy', seed=42)
+    flattened_df = flatten_tweets(df)
+    print(f"Loading {len(flattened_df)} tweets into scratch schema '{args.schema}'")
+
+    admin_engine = create_engine(db_url)
+    with admin_engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {args.schema}"))
+    engine = create_engine(db_url, connect_args={'options': f'-csearch_path={args.schema}'})
+
+    try:
+        Base.metadata.create_all(engine)
+        print(f"{'method':>8} {'batch':>8} {'insert rows/sec':>16} {'update rows/sec':>16}")
+        for method in args.methods:
+            for batch_size in args.batch_sizes:
+                with engine.begin() as conn:
+                    conn.execute(text("TRUNCATE tweets"))
+                # First pass inserts new rows, second pass hits ON CONFLICT for every row
+                insert_rate = time_load(engine, flattened_df, method, batch_size)
+                update_rate = time_load(engine, flattened_df, method, batch_size)
+                print(f"{method:>8} {batch_size:>8} {insert_rate:>16,.0f} {update_rate:>16,.0f}")
+
+                for workers in args.workers:
+                    with engine.begin() as conn:
+                        conn.execute(text("TRUNCATE tweets"))
+                    insert_rate = time_parallel_load(engine, flattened_df, method, batch_size, workers)
+                    update_rate = time_parallel_load(engine, flattened_df, method, batch_size, workers)
+                    label = f"{method} x{workers}"
+                    print(f"{label:>8} {batch_size:>8} {insert_rate:>16,.0f} {update_rate:>16,.0f}")
+    finally:
+        engine.dispose()
+        with admin_engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE"))
+        admin_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 import pandas as pd
 import numpy as np
+import os
 import random
+import shutil
 from datetime import datetime, timedelta
 import uuid
+from itertools import permutations
+from concurrent.futures import ProcessPoolExecutor
+from tweet_schema import flatten_tweets
+from pipeline_metrics import span, traced
 
 # Set random seed for reproducibility
 np.random.seed(42)
@@ -112,21 +118,23 @@ profile_images = [
     "https://images.unsplash.com/photo-1607746882042-944635dfe10e?q=80&w=100&auto=format&fit=crop"
 ]
 
+# Building blocks for usernames and display names
+username_adjectives = ["happy", "tech", "digital", "social", "cyber", "online", "web", "cloud", "smart", "future"]
+username_nouns = ["user", "fan", "guru", "ninja", "expert", "enthusiast", "lover", "pro", "master", "geek"]
+first_names = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth", 
+               "David", "Susan", "Richard", "Jessica", "Joseph", "Sarah", "Thomas", "Karen", "Charles", "Nancy",
+               "Emma", "Olivia", "Noah", "Liam", "Sophia", "Ava", "Jackson", "Aiden", "Lucas", "Chloe"]
+last_names = ["Smith", "Johnson", "Williams", "Jones", "Brown", "Davis", "Miller", "Wilson", "Moore", "Taylor",
+              "Anderson", "Thomas", "Jackson", "White", "Harris", "Martin", "Thompson", "Garcia", "Martinez", "Robinson",
+              "Clark", "Rodriguez", "Lewis", "Lee", "Walker", "Hall", "Allen", "Young", "King", "Wright"]
+
 # Generate random usernames
 def generate_username():
-    adjectives = ["happy", "tech", "digital", "social", "cyber", "online", "web", "cloud", "smart", "future"]
-    nouns = ["user", "fan", "guru", "ninja", "expert", "enthusiast", "lover", "pro", "master", "geek"]
     numbers = ["", str(random.randint(1, 999)), str(random.randint(1, 99))]
-    return random.choice(adjectives) + random.choice(nouns) + random.choice(numbers)
+    return random.choice(username_adjectives) + random.choice(username_nouns) + random.choice(numbers)
 
 # Generate random names
 def generate_name():
-    first_names = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth", 
-                   "David", "Susan", "Richard", "Jessica", "Joseph", "Sarah", "Thomas", "Karen", "Charles", "Nancy",
-                   "Emma", "Olivia", "Noah", "Liam", "Sophia", "Ava", "Jackson", "Aiden", "Lucas", "Chloe"]
-    last_names = ["Smith", "Johnson", "Williams", "Jones", "Brown", "Davis", "Miller", "Wilson", "Moore", "Taylor",
-                  "Anderson", "Thomas", "Jackson", "White", "Harris", "Martin", "Thompson", "Garcia", "Martinez", "Robinson",
-                  "Clark", "Rodriguez", "Lewis", "Lee", "Walker", "Hall", "Allen", "Young", "King", "Wright"]
     return f"{random.choice(first_names)} {random.choice(last_names)}"
 
 # Generate a tweet
@@ -175,7 +183,7 @@ def generate_tweet(company, sentiment, date):
     
     # Create tweet object
     tweet = {
-        "id": str(uuid.uuid4()),
+        "id": str(uuid.UUID(int=random.getrandbits(128), version=4)),
         "text": text,
         "created_at": date.isoformat(),
         "company": company["name"],
@@ -207,10 +215,266 @@ def generate_tweet(company, sentiment, date):
     
     return tweet
 
-# Generate tweets for all companies
-def generate_all_tweets(num_tweets_per_company=5000, days=365):
+# Lookup tables used by the vectorized engine
+username_bases = np.array([adj + noun for adj in username_adjectives for noun in username_nouns], dtype=object)
+username_suffixes = np.array([""] + [str(i) for i in range(1, 1000)], dtype=object)
+full_names = np.array([f"{first} {last}" for first in first_names for last in last_names], dtype=object)
+profile_image_array = np.array(profile_images, dtype=object)
+
+# Generate UUID4 strings in bulk from a NumPy generator
+def generate_uuid_array(rng, n):
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    
+    hex_digits = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+    nibbles = np.empty((n, 32), dtype=np.uint8)
+    nibbles[:, 0::2] = hex_digits[raw >> 4]
+    nibbles[:, 1::2] = hex_digits[raw & 0x0F]
+    
+    chars = np.full((n, 36), ord("-"), dtype=np.uint8)
+    chars[:, 0:8] = nibbles[:, 0:8]
+    chars[:, 9:13] = nibbles[:, 8:12]
+    chars[:, 14:18] = nibbles[:, 12:16]
+    chars[:, 19:23] = nibbles[:, 16:20]
+    chars[:, 24:36] = nibbles[:, 20:32]
+    return chars.view("S36").ravel().astype("U36").astype(object)
+
+# Render every phrase/product combination of a company once, so rows only pick an index
+def render_company_phrases(company, phrases):
+    return np.array([
+        phrase.replace("{product}", product).replace("{company}", company["name"])
+        for phrase in phrases
+        for product in company["topics"]
+    ], dtype=object)
+
+# Enumerate every ordered hashtag sample of size k; a uniform pick is equivalent to random.sample
+def hashtag_permutations(company, k):
+    combos = list(permutations(company["hashtags"], k))
+    strings = np.array([" ".join(f"#{tag}" for tag in combo) for combo in combos], dtype=object)
+    return combos, strings
+
+# Generate the flat columns for one company's tweets with NumPy arrays instead of a per-row loop
+def generate_company_columns(company, num_tweets, days, now, rng, positive_count=None):
+    # Positive tweets come first; shards pass their own share of the company-wide 65%
+    if positive_count is None:
+        positive_count = int(num_tweets * 0.65)
+    is_positive = np.arange(num_tweets) < positive_count
+    n_topics = len(company["topics"])
+    
+    # Dates
+    offsets = (
+        rng.integers(0, days + 1, num_tweets) * 86400 +
+        rng.integers(0, 24, num_tweets) * 3600 +
+        rng.integers(0, 60, num_tweets) * 60 +
+        rng.integers(0, 60, num_tweets)
+    )
+    timestamps = np.datetime64(now, "us") - offsets.astype("timedelta64[s]")
+    
+    # Text from pre-rendered phrase/product combinations
+    positive_texts = render_company_phrases(company, company["positive_phrases"])
+    negative_texts = render_company_phrases(company, company["negative_phrases"])
+    negative_count = num_tweets - positive_count
+    product_idx = rng.integers(0, n_topics, num_tweets)
+    text = np.empty(num_tweets, dtype=object)
+    text[:positive_count] = positive_texts[
+        rng.integers(0, len(company["positive_phrases"]), positive_count) * n_topics + product_idx[:positive_count]
+    ]
+    text[positive_count:] = negative_texts[
+        rng.integers(0, len(company["negative_phrases"]), negative_count) * n_topics + product_idx[positive_count:]
+    ]
+    
+    # Hashtags (30% chance, 1-3 distinct tags)
+    hashtags = np.full(num_tweets, "", dtype=object)
+    hashtags_list = np.full(num_tweets, None, dtype=object)
+    has_tags = rng.random(num_tweets) < 0.3
+    tag_counts = rng.integers(1, 4, num_tweets)
+    for k in (1, 2, 3):
+        rows = np.flatnonzero(has_tags & (tag_counts == k))
+        if len(rows) == 0:
+            continue
+        combos, strings = hashtag_permutations(company, k)
+        picks = rng.integers(0, len(combos), len(rows))
+        hashtags[rows] = strings[picks]
+        hashtags_list[rows] = [list(combos[p]) for p in picks.tolist()]
+    text = np.where(has_tags, text + " " + hashtags, text)
+    
+    # Sentiment
+    sentiment_score = np.round(np.where(
+        is_positive, rng.uniform(0.7, 0.95, num_tweets), rng.uniform(0.05, 0.3, num_tweets)
+    ), 2)
+    sentiment_confidence = np.round(np.where(
+        is_positive, rng.uniform(0.85, 0.98, num_tweets), rng.uniform(0.8, 0.95, num_tweets)
+    ), 2)
+    sentiment_label = np.where(is_positive, "positive", "negative").astype(object)
+    
+    # Users
+    suffix_kind = rng.integers(0, 3, num_tweets)
+    suffix_idx = np.select(
+        [suffix_kind == 1, suffix_kind == 2],
+        [rng.integers(1, 1000, num_tweets), rng.integers(1, 100, num_tweets)],
+        0
+    )
+    user_username = username_bases[rng.integers(0, len(username_bases), num_tweets)] + username_suffixes[suffix_idx]
+    user_name = full_names[rng.integers(0, len(full_names), num_tweets)]
+    user_profile_image_url = profile_image_array[rng.integers(0, len(profile_image_array), num_tweets)]
+    user_followers_count = rng.integers(100, 10001, num_tweets)
+    
+    # Metrics
+    like_count = np.where(is_positive, rng.integers(50, 301, num_tweets), rng.integers(30, 201, num_tweets))
+    retweet_count = (like_count * rng.uniform(0.1, 0.5, num_tweets)).astype(np.int64)
+    reply_count = (like_count * rng.uniform(0.05, 0.3, num_tweets)).astype(np.int64)
+    quote_count = (like_count * rng.uniform(0.02, 0.1, num_tweets)).astype(np.int64)
+    
+    return {
+        "id": generate_uuid_array(rng, num_tweets),
+        "text": text,
+        "created_at": timestamps,
+        "company": np.full(num_tweets, company["name"], dtype=object),
+        "sentiment_score": sentiment_score,
+        "sentiment_label": sentiment_label,
+        "sentiment_confidence": sentiment_confidence,
+        "user_username": user_username,
+        "user_name": user_name,
+        "user_profile_image_url": user_profile_image_url,
+        "user_followers_count": user_followers_count,
+        "retweet_count": retweet_count,
+        "reply_count": reply_count,
+        "like_count": like_count,
+        "quote_count": quote_count,
+        "hashtags": hashtags,
+        "hashtags_list": hashtags_list
+    }
+
+# Build the nested tweet DataFrame (same schema as generate_tweet records) from flat columns
+def build_tweets_frame(columns, index=None):
+    # Match datetime.isoformat(), which omits the fraction when microseconds are zero
+    timestamps = columns["created_at"].astype("datetime64[us]")
+    unit = "us" if (timestamps.astype(np.int64) % 1000000).any() else "s"
+    created_at = np.datetime_as_string(timestamps, unit=unit).astype(object)
+    
+    sentiment = [
+        {"score": score, "label": label, "confidence": confidence}
+        for score, label, confidence in zip(
+            columns["sentiment_score"].tolist(),
+            columns["sentiment_label"].tolist(),
+            columns["sentiment_confidence"].tolist()
+        )
+    ]
+    user = [
+        {"username": username, "name": name, "profile_image_url": image, "followers_count": followers}
+        for username, name, image, followers in zip(
+            columns["user_username"].tolist(),
+            columns["user_name"].tolist(),
+            columns["user_profile_image_url"].tolist(),
+            columns["user_followers_count"].tolist()
+        )
+    ]
+    metrics = [
+        {"retweet_count": retweets, "reply_count": replies, "like_count": likes, "quote_count": quotes}
+        for retweets, replies, likes, quotes in zip(
+            columns["retweet_count"].tolist(),
+            columns["reply_count"].tolist(),
+            columns["like_count"].tolist(),
+            columns["quote_count"].tolist()
+        )
+    ]
+    entities = [
+        {"hashtags": tags} if tags else np.nan
+        for tags in columns["hashtags_list"].tolist()
+    ]
+    
+    return pd.DataFrame({
+        "id": columns["id"],
+        "text": columns["text"],
+        "created_at": created_at,
+        "company": columns["company"],
+        "sentiment": sentiment,
+        "user": user,
+        "metrics": metrics,
+        "hashtags": columns["hashtags"],
+        "entities": entities
+    }, index=index)
+
+# Split each company's volume into fixed-size shards. The plan depends only on the
+# volume and shard size, never on the worker count, so output is identical for any pool size.
+def plan_shards(num_tweets_per_company, shard_size):
+    shards = []
+    for company_index in range(len(companies)):
+        for shard_index, start in enumerate(range(0, num_tweets_per_company, shard_size)):
+            stop = min(start + shard_size, num_tweets_per_company)
+            shards.append((company_index, shard_index, start, stop))
+    return shards
+
+# Generate the flat columns for one shard with its own derived seed (runs in worker processes)
+def generate_shard(task):
+    company_index, shard_index, start, stop, num_tweets_per_company, days, now, entropy = task
+    seed_sequence = np.random.SeedSequence(entropy, spawn_key=(company_index, shard_index))
+    rng = np.random.default_rng(seed_sequence)
+    positive_count = min(max(int(num_tweets_per_company * 0.65) - start, 0), stop - start)
+    return generate_company_columns(companies[company_index], stop - start, days, now, rng,
+                                    positive_count=positive_count)
+
+# Merge shard columns and sort them once by timestamp (newest first)
+def merge_shards(parts):
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    order = np.argsort(-columns["created_at"].astype(np.int64), kind="stable")
+    columns = {name: values[order] for name, values in columns.items()}
+    return build_tweets_frame(columns, index=order)
+
+# Generate tweets for all companies with the vectorized engine, optionally across a process pool
+def generate_all_tweets_vectorized(num_tweets_per_company=5000, days=365, seed=None, workers=1,
+                                   shard_size=250000, now=None):
+    if now is None:
+        now = datetime.now()
+    entropy = np.random.SeedSequence(seed).entropy
+    
+    tasks = [
+        (company_index, shard_index, start, stop, num_tweets_per_company, days, now, entropy)
+        for company_index, shard_index, start, stop in plan_shards(num_tweets_per_company, shard_size)
+    ]
+    print(f"Generating {num_tweets_per_company * len(companies)} tweets in {len(tasks)} shards "
+          f"on {workers} worker(s)...")
+    
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(generate_shard, tasks))
+    else:
+        parts = [generate_shard(task) for task in tasks]
+    
+    return merge_shards(parts)
+
+# Yield tweets as DataFrames of at most batch_size rows, so memory stays flat regardless of volume.
+# Batches are sorted newest first internally; with the same seed they hold the same rows as
+# generate_all_tweets_vectorized(..., shard_size=batch_size).
+def generate_tweet_batches(num_tweets_per_company=5000, days=365, batch_size=10000, seed=None, now=None):
+    if now is None:
+        now = datetime.now()
+    entropy = np.random.SeedSequence(seed).entropy
+    
+    for company_index, shard_index, start, stop in plan_shards(num_tweets_per_company, batch_size):
+        task = (company_index, shard_index, start, stop, num_tweets_per_company, days, now, entropy)
+        with span('generate', rows=stop - start):
+            batch = merge_shards([generate_shard(task)])
+        yield batch
+
+# Generate tweets for all companies, dated up to days before now (default: the current time)
+@traced('generate', rows=len)
+def generate_all_tweets(num_tweets_per_company=5000, days=365, engine="python", seed=None, workers=1, now=None):
+    if engine == "numpy":
+        return generate_all_tweets_vectorized(num_tweets_per_company, days, seed=seed, workers=workers, now=now)
+    if engine != "python":
+        raise ValueError(f"Unknown generation engine: {engine}")
+    if workers != 1:
+        raise ValueError("Parallel generation requires engine='numpy'")
+    
+    # Seed the random module too; it drives every draw in the per-row engine
+    if seed is not None:
+        random.seed(seed)
+    
     all_tweets = []
-    now = datetime.now()
+    if now is None:
+        now = datetime.now()
     
     for company in companies:
         print(f"Generating tweets for {company['name']}...")
@@ -249,16 +513,52 @@ def generate_all_tweets(num_tweets_per_company=5000, days=365):
     
     return df
 
+# Save tweets in the flat CSV layout: one typed column per leaf field, in tweets table order,
+# so loaders can stream it with explicit dtypes instead of evaluating nested cells
+def save_flat_csv(tweets_df, path):
+    flatten_tweets(tweets_df).to_csv(path, index=False)
+
+# Save tweets as a Parquet dataset partitioned by company and month (company=.../month=YYYY-MM/),
+# so readers can project columns and skip partitions instead of parsing whole files. The dataset
+# is written next to path and swapped in, replacing every partition of an earlier dataset there.
+def save_parquet_dataset(tweets_df, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise ImportError("Writing Parquet datasets requires pyarrow (pip install pyarrow)")
+    
+    flattened_df = flatten_tweets(tweets_df)
+    table = pa.Table.from_pandas(flattened_df, preserve_index=False)
+    months = pa.array(flattened_df['created_at'].dt.strftime('%Y-%m'), type=pa.string())
+    table = table.append_column('month', months)
+    
+    temporary_path = f"{path.rstrip(os.sep)}.tmp"
+    shutil.rmtree(temporary_path, ignore_errors=True)
+    ds.write_dataset(
+        table,
+        temporary_path,
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([("company", pa.string()), ("month", pa.string())]), flavor="hive"
+        )
+    )
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temporary_path, path)
+
 # Main execution
 if __name__ == "__main__":
     print("Generating mock tweet data...")
     tweets_df = generate_all_tweets(num_tweets_per_company=5000)
     
-    # Save to CSV file for inspection (optional)
-    tweets_df.to_csv('mock_tweets.csv', index=False)
+    # Save to a flat CSV file (one column per field) for loading and inspection
+    save_flat_csv(tweets_df, 'mock_tweets.csv')
     
     # Also save to JSON for compatibility with existing code
     tweets_df.to_json('mock_tweets.json', orient='records', indent=2)
     
+    # Save a columnar copy partitioned by company and month for fast, selective loads
+    save_parquet_dataset(tweets_df, 'mock_tweets_parquet')
+    
     print(f"Done! Generated {len(tweets_df)} tweets.")
-    print(f"Files created: mock_tweets.csv and mock_tweets.json")
+    print(f"Files created: mock_tweets.csv, mock_tweets.json and mock_tweets_parquet/")
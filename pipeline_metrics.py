@@ -0,0 +1,306 @@
+import atexit
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Instrumentation of the pipeline stages. Every span is timed into a Prometheus-style registry
+# (pipeline_span_seconds, plus row and byte counters); the rest is opt-in through environment
+# variables:
+#   PIPELINE_LOG            '-' (stderr) or a file path: one JSON line per span and event
+#   PIPELINE_METRICS_FILE   write the registry in Prometheus text format there at exit
+#   PIPELINE_CPROFILE       span names (comma-separated, or 'all') to profile with cProfile
+#   PIPELINE_TRACEMALLOC    span names (comma-separated, or 'all') to trace allocations of
+#   PIPELINE_PROFILE_DIR    directory of the <span>.prof files (default: current directory)
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Allocation sites listed in the log of a traced span
+TRACEMALLOC_TOP_SITES = 10
+
+
+# Escape a label value for the Prometheus text format
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Render a sorted label tuple, plus an optional extra label, as {a="1",b="2"}
+def format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra is not None else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+# Thread-safe counters, gauges and histograms keyed by metric name and labels, rendered in the
+# Prometheus text exposition format
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # name -> (type, help), in registration order
+        self.descriptions = {}
+        # (name, labels) -> value, for counters and gauges
+        self.values = {}
+        # (name, labels) -> [per-bucket counts..., +Inf count, sum]
+        self.histograms = {}
+    
+    def describe(self, name, kind, help_text):
+        self.descriptions[name] = (kind, help_text)
+    
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+    
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[(name, tuple(sorted(labels.items())))] = value
+    
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            histogram[bisect_left(LATENCY_BUCKETS, value)] += 1
+            histogram[-1] += value
+    
+    def reset(self):
+        with self.lock:
+            self.values.clear()
+            self.histograms.clear()
+    
+    def render(self):
+        with self.lock:
+            values = sorted(self.values.items())
+            histograms = sorted((key, list(counts)) for key, counts in self.histograms.items())
+        
+        lines = []
+        for name, (kind, help_text) in self.descriptions.items():
+            series = [(labels, value) for (metric, labels), value in values if metric == name]
+            buckets = [(labels, counts) for (metric, labels), counts in histograms if metric == name]
+            if not series and not buckets:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                lines.append(f"{name}{format_labels(labels)} {value}")
+            for labels, counts in buckets:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels, ('le', bound))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {counts[-1]}")
+                lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe('pipeline_span_seconds', 'histogram', "Duration of pipeline spans (whole stages and single batches)")
+REGISTRY.describe('pipeline_span_errors_total', 'counter', "Pipeline spans that ended with an exception")
+REGISTRY.describe('pipeline_rows_total', 'counter', "Rows handled by pipeline spans")
+REGISTRY.describe('pipeline_bytes_total', 'counter', "Bytes handled by pipeline spans")
+REGISTRY.describe('pipeline_span_traced_peak_bytes', 'gauge',
+                  "Peak traced allocations of the latest span of each name traced with PIPELINE_TRACEMALLOC")
+
+# Name of the innermost open span in the current context, reported as the parent of new spans
+_current_span = contextvars.ContextVar('pipeline_span', default=None)
+
+_log_lock = threading.Lock()
+_log_files = {}
+
+
+# Span names selected by a comma-separated environment value ('all' selects every span)
+@functools.lru_cache(maxsize=None)
+def parse_span_names(value):
+    return frozenset(name.strip() for name in value.split(',') if name.strip())
+
+
+def span_selected(variable, name):
+    names = parse_span_names(os.environ.get(variable, ''))
+    return 'all' in names or name in names
+
+
+# Write one structured log line to PIPELINE_LOG, if it is set
+def log_event(event, **fields):
+    destination = os.environ.get('PIPELINE_LOG')
+    if not destination:
+        return
+    line = json.dumps({
+        'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'event': event,
+        'pid': os.getpid(),
+        **fields
+    }, default=str)
+    with _log_lock:
+        if destination == '-':
+            stream = sys.stderr
+        else:
+            stream = _log_files.get(destination)
+            if stream is None:
+                stream = _log_files[destination] = open(destination, 'a', encoding='utf-8')
+        stream.write(line + '\n')
+        stream.flush()
+
+
+# cProfile profilers per span name; each keeps accumulating over every span of its name and
+# is written to <PIPELINE_PROFILE_DIR>/<name>.prof when one ends. Python allows a single active
+# profiler, so spans nested in (or concurrent with) a profiled span are not profiled.
+_profilers = {}
+_profiling = threading.Lock()
+
+
+def start_profile(name):
+    if not span_selected('PIPELINE_CPROFILE', name) or not _profiling.acquire(blocking=False):
+        return None
+    profiler = _profilers.setdefault(name, cProfile.Profile())
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiling tool is active
+        _profiling.release()
+        return None
+    return profiler
+
+
+def stop_profile(name, profiler):
+    profiler.disable()
+    _profiling.release()
+    directory = os.environ.get('PIPELINE_PROFILE_DIR', '.')
+    path = os.path.join(directory, f"{name}.prof")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(path)
+    except OSError as e:
+        # A diagnostics failure must not fail the stage
+        print(f"Could not write the {name} profile to {path}: {e}")
+        return None
+    return path
+
+
+# Allocation tracing is process-wide too, so only the outermost traced span traces; its peak
+# counts only what was allocated while it ran
+_tracing = threading.Lock()
+
+
+def start_tracemalloc(name):
+    if not span_selected('PIPELINE_TRACEMALLOC', name) or tracemalloc.is_tracing():
+        return False
+    if not _tracing.acquire(blocking=False):
+        return False
+    tracemalloc.start()
+    return True
+
+
+def stop_tracemalloc(name, record):
+    _, peak = tracemalloc.get_traced_memory()
+    statistics = tracemalloc.take_snapshot().statistics('lineno')[:TRACEMALLOC_TOP_SITES]
+    tracemalloc.stop()
+    _tracing.release()
+    REGISTRY.set('pipeline_span_traced_peak_bytes', peak, span=name)
+    record['traced_peak_bytes'] = peak
+    record['top_allocations'] = [
+        f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size}" for stat in statistics
+    ]
+
+
+@contextmanager
+def span(name, **fields):
+    """
+    Time a block of pipeline work as a named span.
+    
+    The block receives the span's record (a dict starting with fields) and can add to it;
+    'rows' and 'bytes' also feed the pipeline_rows_total and pipeline_bytes_total counters.
+    When the block ends, its duration is observed in the pipeline_span_seconds histogram and,
+    with PIPELINE_LOG set, the record is logged as one JSON line with the span's name, its
+    parent span and its duration. Spans selected by PIPELINE_CPROFILE or PIPELINE_TRACEMALLOC
+    are also profiled, and the profile file or allocation peak is added to the record.
+    
+    Args:
+        name: Span name, also the 'span' label of its metrics (e.g. 'merge')
+        **fields: Initial fields of the record (e.g. rows=len(batch_df))
+    
+    Yields:
+        dict: The span's record
+    """
+    record = dict(fields)
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    profiler = start_profile(name)
+    tracing = start_tracemalloc(name)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        _current_span.reset(token)
+        if profiler is not None:
+            record['profile'] = stop_profile(name, profiler)
+        if tracing:
+            stop_tracemalloc(name, record)
+        
+        REGISTRY.observe('pipeline_span_seconds', seconds, span=name)
+        if 'rows' in record:
+            REGISTRY.inc('pipeline_rows_total', record['rows'], span=name)
+        if 'bytes' in record:
+            REGISTRY.inc('pipeline_bytes_total', record['bytes'], span=name)
+        if 'error' in record:
+            REGISTRY.inc('pipeline_span_errors_total', span=name)
+        log_event('span', span=name, parent=parent, seconds=round(seconds, 6), **record)
+
+
+# Decorator running each call of a function in a span; rows, if given, computes the span's
+# row count from the return value (e.g. rows=len)
+def traced(name, rows=None, **fields):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, **fields) as record:
+                result = function(*args, **kwargs)
+                if rows is not None:
+                    record['rows'] = rows(result)
+                return result
+        return wrapper
+    return decorate
+
+
+# Iterate over chunks (e.g. from pd.read_sql(..., chunksize=...)) timing each fetch as its own
+# span, so the fetches are measured apart from the work done on each chunk
+def timed_chunks(chunks, name='query', **fields):
+    iterator = iter(chunks)
+    exhausted = object()
+    while True:
+        with span(name, **fields) as record:
+            chunk = next(iterator, exhausted)
+            record['rows'] = 0 if chunk is exhausted else len(chunk)
+        if chunk is exhausted:
+            return
+        yield chunk
+
+
+# Write the registry in Prometheus text format, replacing the file atomically (suitable for
+# node_exporter's textfile collector)
+def write_prometheus(path, registry=REGISTRY):
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        f.write(registry.render())
+    os.replace(temporary_path, path)
+
+
+@atexit.register
+def write_metrics_file_at_exit():
+    path = os.environ.get('PIPELINE_METRICS_FILE')
+    if path:
+        write_prometheus(path)
@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+
+# Layout version of the index manifest
+MANIFEST_VERSION = 1
+
+# Name of the index manifest in the output directory
+MANIFEST_FILE = 'index.json'
+
+# Precompressed encodings and the suffix of their files
+COMPRESSIONS = {'gzip': '.gz', 'brotli': '.br'}
+
+# Characters of content hash kept in shard file names
+HASH_PREFIX_LENGTH = 16
+
+# Serialized JSON is buffered up to this many characters between compressor writes
+WRITE_BUFFER_SIZE = 1 << 16
+
+# Compact separators: the shards are read by machines, not people
+JSON_ENCODER = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+
+# File name stem for a company: lowercase ASCII words joined by dashes
+def company_slug(company):
+    return re.sub(r'[^a-z0-9]+', '-', company.lower()).strip('-') or 'company'
+
+
+# Streaming writer for gzip files. The header carries no file name or timestamp, so the same
+# content always compresses to the same bytes.
+class GzipWriter:
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.compressor = gzip.GzipFile(filename='', mode='wb', compresslevel=9, mtime=0, fileobj=self.file)
+    
+    def write(self, data):
+        self.compressor.write(data)
+    
+    def close(self):
+        self.compressor.close()
+        self.file.close()
+
+
+# brotli is optional; only the brotli compression needs it
+def import_brotli():
+    try:
+        import brotli
+    except ImportError:
+        raise ImportError("Writing brotli-compressed reports requires brotli (pip install brotli)")
+    return brotli
+
+
+# Streaming writer for brotli files
+class BrotliWriter:
+    def __init__(self, path):
+        brotli = import_brotli()
+        self.file = open(path, 'wb')
+        self.compressor = brotli.Compressor(quality=11)
+    
+    def write(self, data):
+        self.file.write(self.compressor.process(data))
+    
+    def close(self):
+        self.file.write(self.compressor.finish())
+        self.file.close()
+
+
+# Writer class of each compression
+COMPRESSION_WRITERS = {'gzip': GzipWriter, 'brotli': BrotliWriter}
+
+
+# Serialize obj as compact JSON straight into one compressed file per compression, hashing the
+# uncompressed bytes on the way; the files are then named after the hash (stem.<hash>.json plus
+# the compression suffix). Returns the SHA-256 of the JSON, its size in bytes and the file name
+# without the compression suffix.
+def write_json_shard(obj, directory, stem, compressions=('gzip',)):
+    temporary_paths = {compression: os.path.join(directory, f".{stem}.tmp.json{COMPRESSIONS[compression]}")
+                       for compression in compressions}
+    writers = [COMPRESSION_WRITERS[compression](path) for compression, path in temporary_paths.items()]
+    digest = hashlib.sha256()
+    size = 0
+    
+    def flush(pieces):
+        nonlocal size
+        data = ''.join(pieces).encode('utf-8')
+        digest.update(data)
+        size += len(data)
+        for writer in writers:
+            writer.write(data)
+    
+    try:
+        pieces = []
+        buffered = 0
+        for piece in JSON_ENCODER.iterencode(obj):
+            pieces.append(piece)
+            buffered += len(piece)
+            if buffered >= WRITE_BUFFER_SIZE:
+                flush(pieces)
+                pieces = []
+                buffered = 0
+        flush(pieces)
+    finally:
+        for writer in writers:
+            writer.close()
+    
+    content_hash = digest.hexdigest()
+    file_name = f"{stem}.{content_hash[:HASH_PREFIX_LENGTH]}.json"
+    for compression, path in temporary_paths.items():
+        os.replace(path, os.path.join(directory, file_name + COMPRESSIONS[compression]))
+    
+    return content_hash, size, file_name
+
+
+# Write the report as one compressed JSON file per window and company (output_dir/<window>/...)
+# and an index manifest (output_dir/index.json) listing each file with its content hash and the
+# summary numbers a company picker needs. Each entry's path is the uncompressed name that clients
+# request; a server with precompressed files enabled answers it from the .gz or .br file. Names
+# change with the content, so the files can be cached forever and only the manifest has to be
+# revalidated. The written windows replace theirs in the existing manifest (other windows are
+# kept, unless it was written with another version or compressions), and the manifest is
+# replaced atomically after the files are in place. Files the previous manifest listed stay for
+# one more generation, so clients holding it can still fetch them; older files are removed.
+def write_report_artifacts(windows_data, output_dir, compressions=('gzip',)):
+    for compression in compressions:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression} (expected one of {', '.join(COMPRESSIONS)})")
+    if 'brotli' in compressions:
+        import_brotli()
+    
+    previous = {'windows': {}}
+    if os.path.exists(os.path.join(output_dir, MANIFEST_FILE)):
+        previous = read_manifest(output_dir)
+    if (previous.get('version'), previous.get('compressions')) == (MANIFEST_VERSION, list(compressions)):
+        windows = dict(previous['windows'])
+    else:
+        windows = {}
+    
+    manifest = {'version': MANIFEST_VERSION, 'compressions': list(compressions), 'windows': windows}
+    for window, companies_data in windows_data.items():
+        window_dir = os.path.join(output_dir, window)
+        os.makedirs(window_dir, exist_ok=True)
+        
+        entries = []
+        for company_data in companies_data:
+            content_hash, size, file_name = write_json_shard(
+                company_data, window_dir, company_slug(company_data['company']), compressions
+            )
+            entries.append({
+                'company': company_data['company'],
+                'logo_url': company_data['logo_url'],
+                'time_period': company_data['time_period'],
+                'overall_score': company_data['sentiment_summary']['overall_score'],
+                'total_tweets': company_data['sentiment_summary']['total_tweets'],
+                'sha256': content_hash,
+                'bytes': size,
+                'path': f"{window}/{file_name}"
+            })
+        windows[window] = entries
+    
+    temporary_path = os.path.join(output_dir, f".{MANIFEST_FILE}.tmp")
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        for piece in JSON_ENCODER.iterencode(manifest):
+            f.write(piece)
+    os.replace(temporary_path, os.path.join(output_dir, MANIFEST_FILE))
+    
+    # Remove the shards that neither the new nor the previous manifest lists (temporary files of
+    # a concurrent writer start with a dot and are left alone)
+    kept = {f"{entry['path']}{suffix}"
+            for listing in (manifest, previous) for entries in listing['windows'].values()
+            for entry in entries for suffix in COMPRESSIONS.values()}
+    suffixes = tuple(f".json{suffix}" for suffix in COMPRESSIONS.values())
+    for window in set(manifest['windows']) | set(previous['windows']):
+        window_dir = os.path.join(output_dir, window)
+        if not os.path.isdir(window_dir):
+            continue
+        for file_name in os.listdir(window_dir):
+            if file_name.endswith(suffixes) and not file_name.startswith('.') and f"{window}/{file_name}" not in kept:
+                os.remove(os.path.join(window_dir, file_name))
+    
+    return manifest
+
+
+# Read the manifest of a report directory
+def read_manifest(output_dir):
+    with open(os.path.join(output_dir, MANIFEST_FILE), encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,355 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from db_models import INGEST_CHANNEL, get_engine, dispose_engines
+from pipeline_metrics import REGISTRY
+from process_tweets_for_frontend import (AGGREGATION_MODES, TIME_WINDOWS, list_company_tweets,
+                                         process_tweets_for_frontend)
+
+# Largest top_k a client may ask for; each distinct value is its own cached computation
+MAX_TOP_K = 20
+
+JSON_CONTENT_TYPE = 'application/json; charset=utf-8'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REGISTRY.describe('sentiment_api_requests_total', 'counter', "HTTP requests answered, by route and status")
+REGISTRY.describe('sentiment_api_request_seconds', 'histogram', "Time to answer an HTTP request, by route")
+REGISTRY.describe('sentiment_api_cache_total', 'counter',
+                  "Report lookups, by result: hit, miss (computed) or coalesced (waited for a computation)")
+REGISTRY.describe('sentiment_api_invalidations_total', 'counter', "Cache invalidations by ingest notifications")
+
+
+# Bounded LRU cache whose entries also expire ttl seconds after they were stored
+class TTLCache:
+    def __init__(self, max_entries=64, ttl=300, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        # key -> (expiry time, value), least recently used first
+        self.entries = OrderedDict()
+    
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if self.clock() >= expires_at:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+    
+    def put(self, key, value):
+        self.entries[key] = (self.clock() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+    
+    def clear(self):
+        self.entries.clear()
+
+
+# Serialize a response body once, with a strong ETag derived from its bytes
+def json_response(obj):
+    body = json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+# Compute one window's report (blocking: runs in a worker thread) and serialize the responses
+# served from it: the company list and each company's CompanySentiment
+def build_window_report(db_url, window, aggregation, top_k):
+    companies_data = process_tweets_for_frontend(db_url=db_url, window=window, aggregation=aggregation,
+                                                 top_k=top_k, output_file=None)
+    return {
+        'index': json_response([{
+            'company': company_data['company'],
+            'logo_url': company_data['logo_url'],
+            'overall_score': company_data['sentiment_summary']['overall_score'],
+            'total_tweets': company_data['sentiment_summary']['total_tweets']
+        } for company_data in companies_data]),
+        'companies': {company_data['company']: json_response(company_data) for company_data in companies_data}
+    }
+
+
+# Route of a request path, as the label of the request metrics
+def route_name(path):
+    if path in ('/healthz', '/metrics', '/api/windows', '/api/companies'):
+        return path
+    if path.startswith('/api/companies/'):
+        return '/api/companies/{company}/tweets' if path.endswith('/tweets') else '/api/companies/{company}'
+    return 'other'
+
+
+# Whether an If-None-Match header matches the ETag (weak comparison, as for GET)
+def etag_matches(if_none_match, etag):
+    if if_none_match is None:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag in (candidate.removeprefix('W/') for candidate in candidates)
+
+
+# Read API over the report computations of process_tweets_for_frontend. Each (window, top_k)
+# report is computed once in a worker thread and kept in a TTL/LRU cache; concurrent requests
+# for a report being computed wait for that computation instead of starting their own. The
+# cache is cleared when a loader commits (LISTEN on the ingest channel), and computations
+# started before that are returned to their waiters but not cached.
+class SentimentAPI:
+    def __init__(self, db_url=None, aggregation='sql', top_k=5, cache_size=64, ttl=300):
+        if aggregation not in AGGREGATION_MODES:
+            raise ValueError(f"Unknown aggregation: {aggregation} (expected one of {', '.join(AGGREGATION_MODES)})")
+        self.db_url = db_url
+        self.aggregation = aggregation
+        self.top_k = top_k
+        self.cache = TTLCache(cache_size, ttl)
+        # (window, top_k) -> task computing that report
+        self.pending = {}
+        # Bumped by every invalidation
+        self.generation = 0
+        self.listener = None
+    
+    def invalidate(self):
+        REGISTRY.inc('sentiment_api_invalidations_total')
+        self.generation += 1
+        self.cache.clear()
+        self.pending.clear()
+    
+    async def report(self, window, top_k):
+        key = (window, top_k)
+        cached = self.cache.get(key)
+        if cached is not None:
+            REGISTRY.inc('sentiment_api_cache_total', result='hit')
+            return cached
+        task = self.pending.get(key)
+        if task is None:
+            REGISTRY.inc('sentiment_api_cache_total', result='miss')
+            task = self.pending[key] = asyncio.ensure_future(self._compute(key))
+        else:
+            REGISTRY.inc('sentiment_api_cache_total', result='coalesced')
+        # A client that disconnects must not cancel the computation other requests wait for
+        return await asyncio.shield(task)
+    
+    async def _compute(self, key):
+        window, top_k = key
+        generation = self.generation
+        loop = asyncio.get_running_loop()
+        try:
+            report = await loop.run_in_executor(None, build_window_report, self.db_url, window, self.aggregation, top_k)
+        finally:
+            if self.pending.get(key) is asyncio.current_task():
+                del self.pending[key]
+        if generation == self.generation:
+            self.cache.put(key, report)
+        return report
+    
+    # Listen for ingest notifications on a dedicated connection watched by the event loop.
+    # Without psycopg2 (or if the connection fails later) reports only expire with the TTL.
+    def listen_for_ingest(self):
+        raw_connection = get_engine(self.db_url).raw_connection()
+        connection = getattr(raw_connection, 'driver_connection', raw_connection)
+        if not hasattr(connection, 'poll'):
+            raw_connection.close()
+            print("Ingest notifications need psycopg2; cached reports will only expire after the TTL")
+            return
+        
+        # The connection stays in autocommit mode, so it must not go back to the pool
+        raw_connection.detach()
+        connection.autocommit = True
+        connection.cursor().execute(f"LISTEN {INGEST_CHANNEL}")
+        asyncio.get_running_loop().add_reader(connection.fileno(), self._on_notify, connection)
+        self.listener = connection
+    
+    def _on_notify(self, connection):
+        try:
+            connection.poll()
+        except Exception as e:
+            asyncio.get_running_loop().remove_reader(connection.fileno())
+            self.listener = None
+            print(f"Stopped listening for ingest notifications ({e}); cached reports will only expire after the TTL")
+            return
+        if connection.notifies:
+            connection.notifies.clear()
+            self.invalidate()
+    
+    def close(self):
+        if self.listener is not None:
+            asyncio.get_running_loop().remove_reader(self.listener.fileno())
+            self.listener.close()
+            self.listener = None
+    
+    # One page of a company's tweets. Pages are cheap keyset reads, so they are not cached.
+    async def tweet_page(self, company, query):
+        sentiment = query.get('sentiment', [None])[0]
+        cursor = query.get('cursor', [None])[0]
+        try:
+            limit = int(query.get('limit', [50])[0])
+        except ValueError:
+            limit = 0
+        loop = asyncio.get_running_loop()
+        try:
+            page = await loop.run_in_executor(None, lambda: list_company_tweets(
+                get_engine(self.db_url), company, sentiment=sentiment, limit=limit, cursor=cursor
+            ))
+        except ValueError as e:
+            return (HTTPStatus.BAD_REQUEST,) + json_response({'error': str(e)})
+        return (HTTPStatus.OK,) + json_response(page)
+    
+    # Route a GET or HEAD request to (status, body, etag)
+    async def dispatch(self, path, query):
+        if path == '/healthz':
+            return (HTTPStatus.OK,) + json_response({'status': 'ok'})
+        if path == '/metrics':
+            body = REGISTRY.render().encode('utf-8')
+            return HTTPStatus.OK, body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        if path == '/api/windows':
+            return (HTTPStatus.OK,) + json_response([
+                {'window': window, 'days': days, 'time_period': time_period}
+                for window, (days, time_period, _) in TIME_WINDOWS.items()
+            ])
+        if path != '/api/companies' and not path.startswith('/api/companies/'):
+            return (HTTPStatus.NOT_FOUND,) + json_response({'error': f"No route for {path}"})
+        if path.endswith('/tweets') and path.count('/') == 4:
+            return await self.tweet_page(unquote(path[len('/api/companies/'):-len('/tweets')]), query)
+        
+        window = query.get('window', ['month'])[0]
+        if window not in TIME_WINDOWS:
+            return (HTTPStatus.BAD_REQUEST,) + json_response(
+                {'error': f"Unknown time window: {window} (expected one of {', '.join(TIME_WINDOWS)})"}
+            )
+        try:
+            top_k = int(query.get('top_k', [self.top_k])[0])
+        except ValueError:
+            top_k = 0
+        if not 1 <= top_k <= MAX_TOP_K:
+            return (HTTPStatus.BAD_REQUEST,) + json_response({'error': f"top_k must be between 1 and {MAX_TOP_K}"})
+        
+        report = await self.report(window, top_k)
+        if path == '/api/companies':
+            return (HTTPStatus.OK,) + report['index']
+        
+        company = unquote(path[len('/api/companies/'):])
+        response = report['companies'].get(company)
+        if response is None:
+            return (HTTPStatus.NOT_FOUND,) + json_response({'error': f"No data for {company} in the {window} window"})
+        return (HTTPStatus.OK,) + response
+    
+    # Serve HTTP/1.1 requests on one connection until the client closes it or asks to
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                parts = request_line.decode('latin-1').split()
+                start = time.perf_counter()
+                route, content_type = 'other', JSON_CONTENT_TYPE
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                
+                # Request bodies are not used; skip them to keep the connection in sync
+                content_length = headers.get('content-length', '0')
+                if content_length.isdigit() and int(content_length) > 0:
+                    await reader.readexactly(int(content_length))
+                
+                if len(parts) != 3:
+                    status, body, etag = (HTTPStatus.BAD_REQUEST,) + json_response({'error': "Malformed request line"})
+                    method, version = 'GET', 'HTTP/1.0'
+                else:
+                    method, target, version = parts
+                    if method not in ('GET', 'HEAD'):
+                        status, body, etag = (HTTPStatus.METHOD_NOT_ALLOWED,) + json_response(
+                            {'error': f"{method} is not allowed"}
+                        )
+                    else:
+                        url = urlsplit(target)
+                        route = route_name(url.path)
+                        if route == '/metrics':
+                            content_type = PROMETHEUS_CONTENT_TYPE
+                        try:
+                            status, body, etag = await self.dispatch(url.path, parse_qs(url.query))
+                        except Exception as e:
+                            print(f"Error serving {target}: {e}")
+                            status, body, etag = (HTTPStatus.INTERNAL_SERVER_ERROR,) + json_response({'error': str(e)})
+                
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                if status == HTTPStatus.OK and etag_matches(headers.get('if-none-match'), etag):
+                    status, body = HTTPStatus.NOT_MODIFIED, b''
+                
+                response_headers = [
+                    f"HTTP/1.1 {status.value} {status.phrase}",
+                    f"Content-Type: {content_type}",
+                    f"ETag: {etag}",
+                    "Cache-Control: no-cache",
+                    "Access-Control-Allow-Origin: *",
+                    "Access-Control-Expose-Headers: ETag",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}"
+                ]
+                if status == HTTPStatus.METHOD_NOT_ALLOWED:
+                    response_headers.append("Allow: GET, HEAD")
+                if status != HTTPStatus.NOT_MODIFIED:
+                    response_headers.append(f"Content-Length: {len(body)}")
+                writer.write(('\r\n'.join(response_headers) + '\r\n\r\n').encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                REGISTRY.inc('sentiment_api_requests_total', route=route, status=status.value)
+                REGISTRY.observe('sentiment_api_request_seconds', time.perf_counter() - start, route=route)
+                
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(api, host='127.0.0.1', port=8000):
+    server = await asyncio.start_server(api.handle_connection, host, port)
+    api.listen_for_ingest()
+    print(f"Serving sentiment reports on http://{host}:{port}/api/companies?window=month")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        api.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the frontend's CompanySentiment data per company and time window")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on (default: 8000)")
+    parser.add_argument('--aggregation', choices=AGGREGATION_MODES, default='sql',
+                        help="Aggregation mode of process_tweets_for_frontend; the rollup has no hourly trend "
+                             "for the day window (default: sql)")
+    parser.add_argument('--top-k', type=int, default=5,
+                        help="Default number of top positive and negative tweets per company (default: 5)")
+    parser.add_argument('--cache-size', type=int, default=64,
+                        help="Most (window, top_k) reports kept in memory (default: 64)")
+    parser.add_argument('--ttl', type=float, default=300,
+                        help="Seconds a cached report is served before it is recomputed (default: 300)")
+    args = parser.parse_args()
+    
+    # Check if DATABASE_URL is set
+    if not os.environ.get('DATABASE_URL'):
+        print("ERROR: DATABASE_URL environment variable is not set.")
+        exit(1)
+    
+    api = SentimentAPI(aggregation=args.aggregation, top_k=args.top_k, cache_size=args.cache_size, ttl=args.ttl)
+    try:
+        asyncio.run(serve(api, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dispose_engines()
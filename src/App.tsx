@@ -8,9 +8,10 @@ import { TopTweets } from '@/components/dashboard/TopTweets';
 import { KeyTopics } from '@/components/dashboard/KeyTopics';
 import { CompanySearch } from '@/components/dashboard/CompanySearch';
 import { companiesData } from '@/data/companiesData';
+import { companiesByWindow } from '@/data/companiesByWindow';
 import { Separator } from '@/components/ui/separator';
 import { parseISO, differenceInDays, subMonths, subYears } from 'date-fns';
-import { Tweet } from '@/types';
+import { Tweet, TimeWindow } from '@/types';
 import { UserMenu } from '@/components/auth/UserMenu';
 import { AuthDialog } from '@/components/auth/AuthDialog';
 import { useAuth } from '@/context/AuthContext';
@@ -33,6 +34,12 @@ function App() {
 
   // Filter data based on selected time period
   const getFilteredData = () => {
+    // Use the precomputed data of the selected window when the processor provided it
+    const precomputed = companiesByWindow[timeFilter as TimeWindow]?.find(
+      company => company.company === selectedCompany.company
+    );
+    if (precomputed) return precomputed;
+
     // Define max days old for each time period
     const maxDays = {
       year: 365,
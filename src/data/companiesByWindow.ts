@@ -0,0 +1,6 @@
+import { CompanySentimentByWindow } from '@/types';
+
+// Precomputed data for each time window, generated by
+// `python process_tweets_for_frontend.py --all-windows` (processed_companies_by_window.json).
+// Windows left out here fall back to companiesData.
+export const companiesByWindow: CompanySentimentByWindow = {};
@@ -57,6 +57,10 @@ export interface CompanySentiment {
   key_topics: Topic[];
 }
 
+export type TimeWindow = 'year' | 'sixMonths' | 'month' | 'week' | 'day';
+
+export type CompanySentimentByWindow = Partial<Record<TimeWindow, CompanySentiment[]>>;
+
 export interface User {
   id: string;
   email: string;
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# The pipeline modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Tests that need PostgreSQL run against TEST_DATABASE_URL, a scratch database they may write
+# to, and are skipped without it
+@pytest.fixture
+def database_url(monkeypatch):
+    url = os.environ.get('TEST_DATABASE_URL')
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    monkeypatch.setenv('DATABASE_URL', url)
+    return url
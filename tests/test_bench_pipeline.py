@@ -0,0 +1,43 @@
+import contextlib
+import io
+
+from benchmarks.bench_pipeline import compare_results, print_results
+
+
+# A results file with the given (rows_per_sec, peak_rss_bytes) per stage
+def results(**stages):
+    return {
+        'tweets': 1000,
+        'companies': 3,
+        'stages': {
+            stage: {'seconds': 1.0, 'rows': 1000, 'rows_per_sec': rows_per_sec, 'peak_rss_bytes': peak_rss_bytes}
+            for stage, (rows_per_sec, peak_rss_bytes) in stages.items()
+        }
+    }
+
+
+# Throughput drops and memory growth beyond their thresholds are reported, smaller changes are not
+def test_compare_results_reports_regressions():
+    baseline = results(generate=(1000, 100 * 2**20), load=(1000, 100 * 2**20), report=(1000, 100 * 2**20))
+    current = results(generate=(900, 110 * 2**20), load=(800, 100 * 2**20), report=(1000, 130 * 2**20))
+    
+    regressions = compare_results(current, baseline, threshold=0.15, memory_threshold=0.25)
+    
+    assert len(regressions) == 2
+    assert regressions[0].startswith("load: 800 rows/sec, 20% below")
+    assert regressions[1].startswith("report: peak RSS 130 MiB, 30% above")
+
+
+# Stages without a throughput (no measurable time) on either side are not compared or fail
+def test_compare_results_skips_stages_without_throughput():
+    baseline = results(flatten=(None, 0), load=(1000, 100 * 2**20))
+    current = results(flatten=(1000, 2**20), load=(None, 100 * 2**20))
+    
+    assert compare_results(current, baseline) == []
+    
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        print_results(current, baseline)
+    lines = output.getvalue().splitlines()
+    assert lines[1].split() == ['flatten', '1,000', '1.00s', '1,000', '1MiB', 'n/a']
+    assert lines[2].split() == ['load', '1,000', '1.00s', 'n/a', '100MiB', 'n/a']
@@ -0,0 +1,64 @@
+import contextlib
+import io
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from generate_mock_tweets import generate_all_tweets, generate_all_tweets_vectorized, save_parquet_dataset
+from load_tweets_to_db import read_parquet_dataset
+
+NOW = datetime(2024, 6, 1, 12)
+
+
+# Generate quietly (the generator reports its progress)
+def generate(function, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(**kwargs)
+
+
+# The pool size never changes the output for a fixed seed and reference time
+def test_workers_produce_identical_frames():
+    one = generate(generate_all_tweets, num_tweets_per_company=500, engine='numpy', seed=11, workers=1, now=NOW)
+    two = generate(generate_all_tweets, num_tweets_per_company=500, engine='numpy', seed=11, workers=2, now=NOW)
+    
+    assert len(one) == 1500
+    assert_frame_equal(one, two)
+
+
+# Also when each company's volume spans several shards, spread unevenly over the pool
+def test_sharded_workers_produce_identical_frames():
+    one = generate(generate_all_tweets_vectorized, num_tweets_per_company=500, seed=11, now=NOW, shard_size=120)
+    three = generate(generate_all_tweets_vectorized, num_tweets_per_company=500, seed=11, now=NOW, shard_size=120,
+                     workers=3)
+    
+    assert_frame_equal(one, three)
+
+
+# Tweets are dated within days before now, newest first, for both engines
+@pytest.mark.parametrize('engine', ['python', 'numpy'])
+def test_now_pins_the_date_range(engine):
+    df = generate(generate_all_tweets, num_tweets_per_company=200, days=10, engine=engine, seed=3, now=NOW)
+    created_at = pd.to_datetime(df['created_at'])
+    
+    assert created_at.max() <= NOW
+    assert created_at.min() >= NOW - timedelta(days=11)
+    assert created_at.is_monotonic_decreasing
+
+
+# Regenerating the Parquet dataset over a narrower range drops the partitions of the earlier run
+def test_parquet_dataset_is_replaced(tmp_path):
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'mock_tweets_parquet')
+    wide = generate(generate_all_tweets, num_tweets_per_company=100, days=90, engine='numpy', seed=5, now=NOW)
+    narrow = generate(generate_all_tweets, num_tweets_per_company=100, days=5, engine='numpy', seed=6, now=NOW)
+    
+    save_parquet_dataset(wide, path)
+    save_parquet_dataset(narrow, path)
+    
+    reread = pd.concat(read_parquet_dataset(path), ignore_index=True)
+    assert len(reread) == len(narrow)
+    assert set(reread['id']) == set(narrow['id'])
+    assert sorted(os.listdir(tmp_path)) == ['mock_tweets_parquet']
@@ -0,0 +1,99 @@
+import contextlib
+import io
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import text
+
+import db_models
+from db_models import _LoadCheckpoint, create_tables, get_engine, upsert_tweets_from_df
+from generate_mock_tweets import generate_all_tweets
+
+
+# A checkpoint over the given committed ranges, without a database
+def checkpoint_with(ranges):
+    checkpoint = _LoadCheckpoint.__new__(_LoadCheckpoint)
+    checkpoint.ranges = sorted(ranges)
+    return checkpoint
+
+
+# Ranges may touch, overlap or leave gaps; only full coverage counts
+@pytest.mark.parametrize('ranges, start, end, committed', [
+    ([], 0, 10, False),
+    ([(0, 10)], 0, 10, True),
+    ([(0, 10)], 2, 8, True),
+    ([(0, 10)], 5, 15, False),
+    ([(0, 10), (10, 20)], 5, 15, True),
+    ([(0, 12), (8, 20)], 0, 20, True),
+    ([(0, 10), (11, 20)], 0, 20, False),
+    ([(10, 20)], 0, 15, False),
+    ([(0, 5), (10, 20)], 10, 20, True),
+])
+def test_is_committed(ranges, start, end, committed):
+    assert checkpoint_with(ranges).is_committed(start, end) == committed
+
+
+# Batch ranges loaded by upsert_tweets_from_df, through the real loader
+@pytest.fixture
+def loaded_batches(monkeypatch):
+    batches = []
+    batch_loader = db_models._batch_loader
+    
+    @contextmanager
+    def recording_batch_loader(engine, method, *args, **kwargs):
+        with batch_loader(engine, method, *args, **kwargs) as load_batch:
+            def record(batch_df, ledger_entry=None):
+                batches.append((ledger_entry['batch_start'], ledger_entry['batch_end']))
+                load_batch(batch_df, ledger_entry)
+            yield record
+    
+    monkeypatch.setattr(db_models, '_batch_loader', recording_batch_loader)
+    return batches
+
+
+# A unique load source, whose ledger rows are removed afterwards
+@pytest.fixture
+def source(database_url):
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_tables()
+    name = f"test-{uuid.uuid4()}"
+    yield name
+    with get_engine().begin() as conn:
+        conn.execute(text("DELETE FROM load_ledger WHERE source = :source"), {'source': name})
+        conn.execute(text("DELETE FROM load_sources WHERE source = :source"), {'source': name})
+
+
+# 30 tweets, loaded in three batches of 10
+@pytest.fixture(scope='module')
+def tweets_df():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return generate_all_tweets(num_tweets_per_company=10, engine='numpy', seed=5)
+
+
+# Load the tweets as a resumable source, returning the number of tweets loaded
+def load(tweets_df, source, content_hash):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return upsert_tweets_from_df(tweets_df, batch_size=10, source=source, content_hash=content_hash)
+
+
+# A completed source is skipped, and a rerun after a failure loads only the missing batches
+def test_committed_batches_are_skipped(tweets_df, source, loaded_batches):
+    checkpoint = _LoadCheckpoint(get_engine(), source, 'hash-a')
+    with get_engine().begin() as conn:
+        conn.exec_driver_sql(db_models.LEDGER_INSERT_SQL, checkpoint.entry(10, 20))
+    
+    assert load(tweets_df, source, 'hash-a') == 30
+    assert loaded_batches == [(0, 10), (20, 30)]
+    
+    assert load(tweets_df, source, 'hash-a') == 0
+    assert loaded_batches == [(0, 10), (20, 30)]
+
+
+# The same source with other contents is a new load: every batch is loaded again
+def test_changed_content_hash_reloads(tweets_df, source, loaded_batches):
+    assert load(tweets_df, source, 'hash-a') == 30
+    assert load(tweets_df, source, 'hash-b') == 30
+    
+    assert loaded_batches == [(0, 10), (10, 20), (20, 30)] * 2
+    assert _LoadCheckpoint(get_engine(), source, 'hash-b').completed_at is not None
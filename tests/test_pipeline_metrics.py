@@ -0,0 +1,64 @@
+import json
+
+import pandas as pd
+import pytest
+
+import db_models
+from pipeline_metrics import span
+
+
+# The span records logged to PIPELINE_LOG while the test runs
+@pytest.fixture
+def span_log(tmp_path, monkeypatch):
+    path = tmp_path / 'pipeline.log'
+    monkeypatch.setenv('PIPELINE_LOG', str(path))
+    
+    def read():
+        return [json.loads(line) for line in path.read_text().splitlines()]
+    return read
+
+
+# Parent of the latest logged span of each name
+def parents(records):
+    return {record['span']: record['parent'] for record in records}
+
+
+# Spans log the span they were opened in
+def test_nested_spans_log_their_parent(span_log):
+    with span('outer'):
+        with span('inner', rows=3):
+            pass
+    
+    assert parents(span_log()) == {'inner': 'outer', 'outer': None}
+
+
+# Spans opened by the prefetch producer thread keep the consumer's span as parent
+def test_prefetch_producer_inherits_span(span_log):
+    def produce():
+        for item in range(3):
+            with span('produce'):
+                pass
+            yield item
+    
+    with span('consume'):
+        assert list(db_models._prefetch(produce())) == [0, 1, 2]
+    
+    assert parents(span_log())['produce'] == 'consume'
+
+
+# Spans opened by the parallel upsert workers keep the caller's span as parent
+def test_upsert_workers_inherit_span(span_log, monkeypatch):
+    def load_partition(engine, partition_df, worker, batch_size, method):
+        with span('worker', worker=worker):
+            return len(partition_df)
+    
+    monkeypatch.setattr(db_models, '_load_partition', load_partition)
+    monkeypatch.setattr(db_models, 'is_tweets_partitioned', lambda engine: False)
+    flattened_df = pd.DataFrame({'id': [str(i) for i in range(40)]})
+    
+    with span('upsert'):
+        assert db_models._upsert_partitioned(None, flattened_df, 3, 10, 'copy') == 40
+    
+    workers = [record for record in span_log() if record['span'] == 'worker']
+    assert len(workers) == 3
+    assert {record['parent'] for record in workers} == {'upsert'}
@@ -0,0 +1,68 @@
+import contextlib
+import io
+import pickle
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from db_models import flatten_tweets
+from generate_mock_tweets import generate_all_tweets_vectorized
+from process_tweets_for_frontend import ReportAggregator, add_by_day, aggregate_tweets_frame, merge_aggregators
+
+TOP_K = 5
+
+
+# A fixed generated frame shaped as read from the database: engagement_score and hashtags_list
+# as the database computes them, newest first
+@pytest.fixture(scope='module')
+def tweets_df():
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = flatten_tweets(generate_all_tweets_vectorized(num_tweets_per_company=2000, days=30, seed=7,
+                                                           now=datetime(2024, 6, 1, 12)))
+    df['created_at'] = pd.to_datetime(df['created_at'])
+    df['engagement_score'] = (df['retweet_count'] * 2 + df['like_count'] +
+                              df['reply_count'] * 1.5 + df['quote_count'] * 1.5)
+    df['hashtags_list'] = [[tag.lstrip('#') for tag in hashtags.split()] for hashtags in df['hashtags']]
+    return df.sort_values('created_at', ascending=False, ignore_index=True)
+
+
+# Summary, trend and top frames are equal, values and dtypes alike
+def assert_results_equal(actual, expected):
+    for actual_df, expected_df in zip(actual, expected):
+        assert_frame_equal(actual_df, expected_df)
+
+
+# Streaming chunks of any size through one aggregator gives the in-memory result
+@pytest.mark.parametrize('chunk_size', [250, 997, 6000])
+def test_chunked_add_matches_frame(tweets_df, chunk_size):
+    expected = aggregate_tweets_frame(tweets_df, TOP_K, 'week')
+    
+    aggregator = ReportAggregator(TOP_K, 'week')
+    for start in range(0, len(tweets_df), chunk_size):
+        aggregator.add(tweets_df.iloc[start:start + chunk_size])
+    
+    assert_results_equal(aggregator.result(), expected)
+
+
+# Per-day aggregators built chunk by chunk (as the incremental mode does), saved and restored,
+# then merged newest day first into coarser trend periods give the result of one pass
+@pytest.mark.parametrize('granularity', ['hour', 'day', 'week', 'month'])
+def test_day_aggregators_merge_to_frame(tweets_df, granularity):
+    expected = ReportAggregator(TOP_K, granularity, count_hashtags=True)
+    expected.add(tweets_df)
+    
+    day_aggregators = {}
+    for start in range(0, len(tweets_df), 997):
+        add_by_day(day_aggregators, tweets_df.iloc[start:start + 997], TOP_K)
+    saved = pickle.loads(pickle.dumps({day: aggregator.to_state() for day, aggregator in day_aggregators.items()}))
+    restored = [ReportAggregator.from_state(saved[day]) for day in sorted(saved, reverse=True)]
+    merged = merge_aggregators(restored, TOP_K, granularity, count_hashtags=True)
+    
+    assert_results_equal(merged.result(), aggregate_tweets_frame(tweets_df, TOP_K, granularity))
+    assert_results_equal(merged.result(), expected.result())
+    assert merged.hashtags == expected.hashtags
+    assert merged.hashtag_topics().keys() == expected.hashtag_topics().keys()
+    for company, topics in expected.hashtag_topics().items():
+        assert_frame_equal(merged.hashtag_topics()[company], topics)
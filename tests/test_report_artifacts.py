@@ -0,0 +1,62 @@
+import gzip
+import json
+import os
+
+from report_artifacts import write_report_artifacts
+
+
+# Minimal report entry of a company
+def company_data(company, score):
+    return {
+        'company': company,
+        'logo_url': f"https://example.com/{company}.png",
+        'time_period': 'Last 24 hours',
+        'sentiment_summary': {'overall_score': score, 'total_tweets': 10},
+    }
+
+
+# Shard files on disk in a window directory
+def shard_names(output_dir, window):
+    return sorted(os.listdir(os.path.join(output_dir, window)))
+
+
+# Each shard holds its company's JSON and is listed under its window
+def test_shards_round_trip(tmp_path):
+    manifest = write_report_artifacts({'day': [company_data('Apple Inc.', 0.5)]}, str(tmp_path))
+    
+    entry, = manifest['windows']['day']
+    with gzip.open(tmp_path / (entry['path'] + '.gz'), 'rt', encoding='utf-8') as f:
+        assert json.load(f) == company_data('Apple Inc.', 0.5)
+    assert json.loads((tmp_path / 'index.json').read_text()) == manifest
+
+
+# Writing some windows keeps the entries of the others
+def test_partial_write_keeps_other_windows(tmp_path):
+    first = write_report_artifacts({'day': [company_data('Apple Inc.', 0.1)],
+                                    'week': [company_data('Apple Inc.', 0.2)]}, str(tmp_path))
+    second = write_report_artifacts({'day': [company_data('Apple Inc.', 0.3)]}, str(tmp_path))
+    
+    assert second['windows']['week'] == first['windows']['week']
+    assert second['windows']['day'] != first['windows']['day']
+    assert shard_names(tmp_path, 'week') == [first['windows']['week'][0]['path'].split('/')[1] + '.gz']
+
+
+# Superseded shards survive one more write, for clients still holding the previous manifest
+def test_superseded_shards_kept_for_one_generation(tmp_path):
+    paths = []
+    for score in (0.1, 0.2, 0.3):
+        manifest = write_report_artifacts({'day': [company_data('Apple Inc.', score)]}, str(tmp_path))
+        paths.append(manifest['windows']['day'][0]['path'].split('/')[1] + '.gz')
+    
+    assert shard_names(tmp_path, 'day') == sorted(paths[1:])
+
+
+# A manifest written with other compressions is not merged
+def test_other_compressions_start_a_new_manifest(tmp_path):
+    write_report_artifacts({'week': [company_data('Apple Inc.', 0.2)]}, str(tmp_path))
+    with open(tmp_path / 'index.json', 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'compressions': ['brotli'], 'windows': {'week': []}}, f)
+    
+    manifest = write_report_artifacts({'day': [company_data('Apple Inc.', 0.1)]}, str(tmp_path))
+    
+    assert list(manifest['windows']) == ['day']
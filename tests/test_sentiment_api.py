@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+import sentiment_api
+from sentiment_api import SentimentAPI, TTLCache, etag_matches
+
+
+# Clock advanced by hand
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+# Stand-in for build_window_report that counts its calls and blocks until released
+class BlockingBuild:
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+    
+    def __call__(self, db_url, window, aggregation, top_k):
+        self.calls += 1
+        call = self.calls
+        self.started.set()
+        self.release.wait(5)
+        return {'window': window, 'top_k': top_k, 'build': call}
+
+
+# Wait in a thread for an event set by an executor thread, without blocking the event loop
+async def wait_for(event):
+    assert await asyncio.get_running_loop().run_in_executor(None, event.wait, 5)
+
+
+# Entries expire ttl seconds after they were stored
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=4, ttl=10, clock=clock)
+    cache.put('a', 1)
+    
+    clock.now = 9.9
+    assert cache.get('a') == 1
+    clock.now = 10
+    assert cache.get('a') is None
+    assert 'a' not in cache.entries
+
+
+# Reads refresh an entry's recency but not its expiry
+def test_ttl_cache_evicts_least_recently_used():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=2, ttl=10, clock=clock)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    
+    assert list(cache.entries) == ['a', 'c']
+    clock.now = 10
+    assert cache.get('a') is None
+
+
+# Requests for a report being computed wait for that computation, and later ones hit the cache
+def test_concurrent_misses_share_one_computation(monkeypatch):
+    build = BlockingBuild()
+    monkeypatch.setattr(sentiment_api, 'build_window_report', build)
+    
+    async def scenario():
+        api = SentimentAPI()
+        requests = [asyncio.ensure_future(api.report('month', 5)) for _ in range(8)]
+        await wait_for(build.started)
+        build.release.set()
+        reports = await asyncio.gather(*requests)
+        assert await api.report('month', 5) is reports[0]
+        return reports
+    
+    reports = asyncio.run(scenario())
+    
+    assert build.calls == 1
+    assert all(report is reports[0] for report in reports)
+
+
+# A report computed across an invalidation goes to its waiters but is not cached, and requests
+# after the invalidation start a fresh computation
+def test_invalidation_during_build_is_not_cached(monkeypatch):
+    build = BlockingBuild()
+    monkeypatch.setattr(sentiment_api, 'build_window_report', build)
+    
+    async def scenario():
+        api = SentimentAPI()
+        stale_request = asyncio.ensure_future(api.report('week', 5))
+        await wait_for(build.started)
+        api.invalidate()
+        fresh_request = asyncio.ensure_future(api.report('week', 5))
+        build.release.set()
+        stale, fresh = await asyncio.gather(stale_request, fresh_request)
+        return api, stale, fresh
+    
+    api, stale, fresh = asyncio.run(scenario())
+    
+    assert build.calls == 2
+    assert stale['build'] != fresh['build']
+    assert api.cache.get(('week', 5)) is fresh
+    assert api.pending == {}
+
+
+# If-None-Match lists, weak validators and '*'
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches('"def"', '"abc"')
+    assert not etag_matches(None, '"abc"')
@@ -0,0 +1,51 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from process_tweets_for_frontend import decode_tweet_cursor, encode_tweet_cursor, list_company_tweets
+
+
+# URL-safe base64 of a JSON value, as the cursors are encoded
+def encode_payload(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+# Cursors decode to the position they encode and are URL-safe without padding
+@pytest.mark.parametrize('created_at, tweet_id', [
+    (datetime(2024, 2, 29, 23, 59, 59, 999999), 'tweet-1'),
+    (datetime(2024, 1, 1), 'ünïcode/+=?&'),
+])
+def test_cursor_round_trip(created_at, tweet_id):
+    cursor = encode_tweet_cursor(created_at, tweet_id)
+    
+    assert decode_tweet_cursor(cursor) == (created_at, tweet_id)
+    assert cursor == cursor.strip('=') and set(cursor) <= set(
+        'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+    )
+
+
+# Garbled, truncated or re-encoded cursors of the wrong shape raise ValueError
+@pytest.mark.parametrize('cursor', [
+    '',
+    'not a cursor!',
+    encode_tweet_cursor(datetime(2024, 1, 1), 'tweet-1')[:-3],
+    encode_tweet_cursor(datetime(2024, 1, 1), 'tweet-1')[2:],
+    encode_payload(['2024-01-01T00:00:00']),
+    encode_payload(['2024-01-01T00:00:00', 'tweet-1', 'extra']),
+    encode_payload(['yesterday', 'tweet-1']),
+    encode_payload([20240101, 'tweet-1']),
+    encode_payload({'created_at': '2024-01-01', 'id': 'tweet-1'}),
+    encode_payload(42),
+    base64.urlsafe_b64encode(b'\xff\xfe').decode('ascii'),
+])
+def test_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_tweet_cursor(cursor)
+
+
+# The listing rejects a bad cursor before querying
+def test_listing_rejects_tampered_cursor():
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        list_company_tweets(None, 'Apple Inc.', cursor='not a cursor!')
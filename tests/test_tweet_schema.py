@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from tweet_schema import TWEET_COLUMNS, flatten_tweets
+
+
+# The per-field Series.apply flattening that flatten_tweets replaced
+def apply_flatten(df):
+    flattened_df = pd.DataFrame()
+    flattened_df['id'] = df['id']
+    flattened_df['text'] = df['text']
+    flattened_df['created_at'] = pd.to_datetime(df['created_at'])
+    flattened_df['company'] = df['company']
+    flattened_df['sentiment_score'] = df['sentiment'].apply(lambda x: x['score'])
+    flattened_df['sentiment_label'] = df['sentiment'].apply(lambda x: x['label'])
+    flattened_df['sentiment_confidence'] = df['sentiment'].apply(lambda x: x.get('confidence'))
+    flattened_df['user_username'] = df['user'].apply(lambda x: x['username'])
+    flattened_df['user_name'] = df['user'].apply(lambda x: x['name'])
+    flattened_df['user_profile_image_url'] = df['user'].apply(lambda x: x['profile_image_url'])
+    flattened_df['user_followers_count'] = df['user'].apply(lambda x: x['followers_count'])
+    flattened_df['retweet_count'] = df['metrics'].apply(lambda x: x['retweet_count'])
+    flattened_df['reply_count'] = df['metrics'].apply(lambda x: x['reply_count'])
+    flattened_df['like_count'] = df['metrics'].apply(lambda x: x['like_count'])
+    flattened_df['quote_count'] = df['metrics'].apply(lambda x: x['quote_count'])
+    
+    def extract_hashtags(row):
+        if 'entities' in row and row['entities'] and 'hashtags' in row['entities']:
+            hashtags = row['entities']['hashtags']
+            if hashtags and len(hashtags) > 0:
+                return ' '.join([f"#{tag}" for tag in hashtags])
+        return ""
+    
+    flattened_df['hashtags'] = df.apply(extract_hashtags, axis=1)
+    return flattened_df
+
+
+# Nested tweet records covering a missing confidence and empty, missing or absent hashtags
+def nested_tweets():
+    entities = [{'hashtags': ['Tesla', 'EV']}, {'hashtags': []}, {}, None]
+    confidences = [0.9, None, 0.75, None]
+    return pd.DataFrame([
+        {
+            'id': f"tweet-{i}",
+            'text': f"Tweet {i}",
+            'created_at': f"2024-05-0{i + 1}T12:00:00",
+            'company': 'Tesla' if i % 2 else 'Apple Inc.',
+            'sentiment': {'score': 0.25 * i - 0.5, 'label': ['negative', 'neutral', 'positive', 'positive'][i],
+                          **({} if confidence is None else {'confidence': confidence})},
+            'user': {'username': f"user{i}", 'name': f"User {i}",
+                     'profile_image_url': f"https://example.com/{i}.png", 'followers_count': 10 * i},
+            'metrics': {'retweet_count': i, 'reply_count': i + 1, 'like_count': 2 * i, 'quote_count': 0},
+            'entities': entity
+        }
+        for i, (entity, confidence) in enumerate(zip(entities, confidences))
+    ], index=[3, 5, 7, 9])
+
+
+# flatten_tweets matches the apply-based flattening, with or without an entities column
+@pytest.mark.parametrize('with_entities', [True, False])
+def test_flatten_matches_apply_flatten(with_entities):
+    df = nested_tweets()
+    if not with_entities:
+        df = df.drop(columns='entities')
+    
+    flattened = flatten_tweets(df)
+    
+    assert list(flattened.columns) == TWEET_COLUMNS
+    assert_frame_equal(flattened, apply_flatten(df))
+    assert flattened['sentiment_confidence'].isna().tolist() == [False, True, False, True]
+    expected_hashtags = ["#Tesla #EV", "", "", ""] if with_entities else [""] * 4
+    assert flattened['hashtags'].tolist() == expected_hashtags
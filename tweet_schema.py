@@ -0,0 +1,101 @@
+import pandas as pd
+import numpy as np
+from operator import itemgetter
+
+from pipeline_metrics import traced
+
+# Flat tweet layout shared by the generator, the loaders and the tables. Kept free of
+# database imports so the generator runs without SQLAlchemy.
+
+# Columns written by the loaders, in table order
+TWEET_COLUMNS = [
+    'id', 'text', 'created_at', 'company',
+    'sentiment_score', 'sentiment_label', 'sentiment_confidence',
+    'user_username', 'user_name', 'user_profile_image_url', 'user_followers_count',
+    'retweet_count', 'reply_count', 'like_count', 'quote_count', 'hashtags'
+]
+
+# Column dtypes of the flat tweet layout (created_at is parsed as a datetime)
+FLAT_TWEET_DTYPES = {
+    'id': str,
+    'text': str,
+    'company': str,
+    'sentiment_score': 'float64',
+    'sentiment_label': str,
+    'sentiment_confidence': 'float64',
+    'user_username': str,
+    'user_name': str,
+    'user_profile_image_url': str,
+    'user_followers_count': 'int64',
+    'retweet_count': 'int64',
+    'reply_count': 'int64',
+    'like_count': 'int64',
+    'quote_count': 'int64',
+    'hashtags': str
+}
+
+# Nested record fields and the flat columns (and NumPy dtypes) they map to;
+# a dtype of None keeps the values as Python objects (strings)
+NESTED_TWEET_FIELDS = {
+    'sentiment': {
+        'score': ('sentiment_score', np.float64),
+        'label': ('sentiment_label', None),
+        'confidence': ('sentiment_confidence', np.float64)
+    },
+    'user': {
+        'username': ('user_username', None),
+        'name': ('user_name', None),
+        'profile_image_url': ('user_profile_image_url', None),
+        'followers_count': ('user_followers_count', np.int64)
+    },
+    'metrics': {
+        'retweet_count': ('retweet_count', np.int64),
+        'reply_count': ('reply_count', np.int64),
+        'like_count': ('like_count', np.int64),
+        'quote_count': ('quote_count', np.int64)
+    }
+}
+
+
+# Flatten nested tweet records (sentiment/user/metrics dicts, entities hashtags) into the
+# flat column layout of the tweets table. Each nested column is converted to a Python list
+# once and every field is pulled out with a single C-level map, instead of one
+# Series.apply per field and a row-wise apply for hashtags.
+@traced('flatten', rows=len)
+def flatten_tweets(df):
+    # Frames already in the flat layout (e.g. read from a flat CSV) pass through
+    if 'sentiment' not in df.columns:
+        return df[TWEET_COLUMNS]
+    
+    num_rows = len(df)
+    flattened = {
+        'id': df['id'],
+        'text': df['text'],
+        'created_at': pd.to_datetime(df['created_at']),
+        'company': df['company']
+    }
+    
+    for column, fields in NESTED_TWEET_FIELDS.items():
+        records = df[column].tolist()
+        for key, (flat_name, dtype) in fields.items():
+            if key == 'confidence':
+                # Confidence is optional in the source records
+                values = np.array([record.get(key) for record in records], dtype=dtype)
+            elif dtype is not None:
+                values = np.fromiter(map(itemgetter(key), records), dtype=dtype, count=num_rows)
+            else:
+                values = np.array(list(map(itemgetter(key), records)), dtype=object)
+            flattened[flat_name] = pd.Series(values, index=df.index)
+    
+    # Join entities.hashtags into the "#a #b" form stored in the table
+    if 'entities' in df.columns:
+        hashtags = [
+            "#" + " #".join(entities['hashtags'])
+            if isinstance(entities, dict) and entities.get('hashtags') else ""
+            for entities in df['entities'].tolist()
+        ]
+    else:
+        hashtags = [""] * num_rows
+    flattened['hashtags'] = pd.Series(np.array(hashtags, dtype=object), index=df.index)
+    
+    return pd.DataFrame(flattened)